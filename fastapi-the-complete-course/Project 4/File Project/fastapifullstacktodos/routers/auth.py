@@ -12,6 +12,8 @@ from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from datetime import datetime, timedelta
+import calendar
+import time
 from jose import jwt, JWTError
 
 from fastapi.responses import HTMLResponse
@@ -29,6 +31,13 @@ models.Base.metadata.create_all(bind=engine)
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="token")
 
+# verified tokens -> (user, cached until), so the pages a user clicks through
+# don't decode the same cookie again, entries are kept at most
+# TOKEN_CACHE_SECONDS and never past the exp of the token
+TOKEN_CACHE_SECONDS = 60
+TOKEN_CACHE_SIZE = 1000
+token_cache = {}
+
 
 router = APIRouter(
     prefix="/auth",
@@ -86,22 +95,55 @@ def create_access_token(username: str, user_id: int,
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     encode.update({"exp": expire})
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    token = jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    # the redirect after login finds the new token already verified
+    # expire is a naive utc datetime, timegm reads it as utc like jwt does
+    cache_token(token, {"username": username, "id": user_id},
+                calendar.timegm(expire.utctimetuple()))
+    return token
+
+
+def cache_token(token: str, user: dict, expires_at: float):
+    if len(token_cache) >= TOKEN_CACHE_SIZE:
+        # drop the oldest entry, dicts keep insertion order
+        del token_cache[next(iter(token_cache))]
+    token_cache[token] = (user, min(expires_at, time.time() + TOKEN_CACHE_SECONDS))
+
+
+def decode_token(token: str):
+    cached = token_cache.get(token)
+    if cached is not None:
+        user, cached_until = cached
+        if cached_until > time.time():
+            return user
+        del token_cache[token]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username: str = payload.get("sub")
+    user_id: int = payload.get("id")
+    user = {"username": username, "id": user_id}
+    if username is not None and user_id is not None:
+        cache_token(token, user, payload["exp"])
+    return user
 
 
 async def get_current_user(request: Request):
+    # use it as a dependency, the user is kept on request.state so anything
+    # else asking for it during the same request gets it without a decode
+    if hasattr(request.state, "user"):
+        return request.state.user
     try:
         token = request.cookies.get("access_token")
         if token is None:
-            return None
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("id")
-        if username is None or user_id is None:
-            logout(request)
-        return {"username": username, "id": user_id}
+            user = None
+        else:
+            user = decode_token(token)
+            if user.get("username") is None or user.get("id") is None:
+                logout(request)
     except JWTError:
         raise HTTPException(status_code=404, detail="Not found")
+    request.state.user = user
+    return user
 
 
 @router.post("/token")
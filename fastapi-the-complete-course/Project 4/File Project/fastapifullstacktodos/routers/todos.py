@@ -4,6 +4,7 @@ sys.path.append("..")
 from starlette import status
 from starlette.responses import RedirectResponse
 
+from typing import Optional
 from fastapi import Depends, APIRouter, Request, Form
 import models
 from database import engine, SessionLocal
@@ -34,9 +35,9 @@ def get_db():
 
 
 @router.get("/", response_class=HTMLResponse)
-async def read_all_by_user(request: Request, db: Session = Depends(get_db)):
+async def read_all_by_user(request: Request, db: Session = Depends(get_db),
+                           user: Optional[dict] = Depends(get_current_user)):
 
-    user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -46,8 +47,8 @@ async def read_all_by_user(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/add-todo", response_class=HTMLResponse)
-async def add_new_todo(request: Request):
-    user = await get_current_user(request)
+async def add_new_todo(request: Request,
+                       user: Optional[dict] = Depends(get_current_user)):
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -56,8 +57,8 @@ async def add_new_todo(request: Request):
 
 @router.post("/add-todo", response_class=HTMLResponse)
 async def create_todo(request: Request, title: str = Form(...), description: str = Form(...),
-                      priority: int = Form(...), db: Session = Depends(get_db)):
-    user = await get_current_user(request)
+                      priority: int = Form(...), db: Session = Depends(get_db),
+                      user: Optional[dict] = Depends(get_current_user)):
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -75,9 +76,9 @@ async def create_todo(request: Request, title: str = Form(...), description: str
 
 
 @router.get("/edit-todo/{todo_id}", response_class=HTMLResponse)
-async def edit_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def edit_todo(request: Request, todo_id: int, db: Session = Depends(get_db),
+                    user: Optional[dict] = Depends(get_current_user)):
 
-    user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -89,9 +90,9 @@ async def edit_todo(request: Request, todo_id: int, db: Session = Depends(get_db
 @router.post("/edit-todo/{todo_id}", response_class=HTMLResponse)
 async def edit_todo_commit(request: Request, todo_id: int, title: str = Form(...),
                            description: str = Form(...), priority: int = Form(...),
-                           db: Session = Depends(get_db)):
+                           db: Session = Depends(get_db),
+                           user: Optional[dict] = Depends(get_current_user)):
 
-    user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -108,9 +109,9 @@ async def edit_todo_commit(request: Request, todo_id: int, title: str = Form(...
 
 
 @router.get("/delete/{todo_id}")
-async def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_db),
+                      user: Optional[dict] = Depends(get_current_user)):
 
-    user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -128,9 +129,9 @@ async def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_
 
 
 @router.get("/complete/{todo_id}", response_class=HTMLResponse)
-async def complete_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def complete_todo(request: Request, todo_id: int, db: Session = Depends(get_db),
+                        user: Optional[dict] = Depends(get_current_user)):
 
-    user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth", status_code=status.HTTP_302_FOUND)
 
@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from starlette import status
+
+
+class AdmissionLimiter:
+    """Caps how many callers run at once and how many may wait for a turn.
+
+    Callers beyond ``max_concurrency`` queue up. Once ``max_queue`` callers
+    are waiting, or a caller has waited ``queue_timeout`` seconds, it is
+    turned away with a 503 and a Retry-After header instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _reject(self):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many requests in progress, try again later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        # counts are updated before any await, so concurrent callers
+        # can't all slip past this check at once
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected_queue_full += 1
+            self._reject()
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            self._reject()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
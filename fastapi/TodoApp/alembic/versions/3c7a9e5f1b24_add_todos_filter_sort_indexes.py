@@ -0,0 +1,85 @@
+"""add todos filter and sort indexes
+
+Revision ID: 3c7a9e5f1b24
+Revises: 9d4f61a2c8e0
+Create Date: 2026-10-18 15:41:07.392518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3c7a9e5f1b24"
+down_revision: Union[str, None] = "9d4f61a2c8e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_priority_id",
+            "todos",
+            ["owner_id", "priority", "id"],
+            postgresql_concurrently=True,
+        )
+        # replaces ix_todos_owner_id_complete_priority, id is added so the
+        # keyset pages sorted by priority come straight from the index
+        op.create_index(
+            "ix_todos_owner_id_complete_priority_id",
+            "todos",
+            ["owner_id", "complete", "priority", "id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_owner_id_complete_priority",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+        # complete filter with the default id sort
+        op.create_index(
+            "ix_todos_owner_id_complete_id",
+            "todos",
+            ["owner_id", "complete", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_todos_owner_id_title",
+            "todos",
+            ["owner_id", "title"],
+            postgresql_ops={"title": "text_pattern_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_title",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_owner_id_complete_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_todos_owner_id_complete_priority",
+            "todos",
+            ["owner_id", "complete", "priority"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_owner_id_complete_priority_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_owner_id_priority_id",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,48 @@
+"""create todos owner indexes
+
+Revision ID: 5b2e8d1c7a43
+Revises:
+Create Date: 2026-10-18 10:12:40.118203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2e8d1c7a43"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, and it
+    # doesn't lock the table against writes while the index is built
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_todos_owner_id_id",
+            "todos",
+            ["owner_id", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_todos_owner_id_complete_priority",
+            "todos",
+            ["owner_id", "complete", "priority"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_todos_owner_id_complete_priority",
+            table_name="todos",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_todos_owner_id_id", table_name="todos", postgresql_concurrently=True
+        )
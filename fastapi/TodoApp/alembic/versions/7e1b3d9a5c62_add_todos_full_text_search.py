@@ -0,0 +1,74 @@
+"""add todos full text search
+
+Revision ID: 7e1b3d9a5c62
+Revises: 3c7a9e5f1b24
+Create Date: 2026-10-18 17:05:22.806114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7e1b3d9a5c62"
+down_revision: Union[str, None] = "3c7a9e5f1b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # btree_gin lets the GIN index lead with owner_id
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        # adding a stored generated column rewrites the table
+        op.execute(
+            "ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+            "(to_tsvector('english', coalesce(title, '') || ' ' || "
+            "coalesce(description, ''))) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY ix_todos_owner_id_search_vector "
+                "ON todos USING gin (owner_id, search_vector)"
+            )
+    elif op.get_bind().dialect.name == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE todos_fts USING fts5("
+            "title, description, content='todos', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_update AFTER UPDATE ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); END"
+        )
+        # index the todos that already exist
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute(
+                "DROP INDEX CONCURRENTLY IF EXISTS ix_todos_owner_id_search_vector"
+            )
+        op.execute("ALTER TABLE todos DROP COLUMN search_vector")
+        # btree_gin is left installed, other indexes may use it
+    elif op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER todos_fts_update")
+        op.execute("DROP TRIGGER todos_fts_delete")
+        op.execute("DROP TRIGGER todos_fts_insert")
+        op.execute("DROP TABLE todos_fts")
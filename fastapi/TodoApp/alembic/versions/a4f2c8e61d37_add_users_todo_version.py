@@ -0,0 +1,90 @@
+"""add users todo version
+
+Revision ID: a4f2c8e61d37
+Revises: 7e1b3d9a5c62
+Create Date: 2026-10-18 18:22:51.640297
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a4f2c8e61d37"
+down_revision: Union[str, None] = "7e1b3d9a5c62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a constant server default doesn't rewrite the table on postgres 11+
+    op.add_column(
+        "users",
+        sa.Column("todo_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # triggers on todos bump the version on every write
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "CREATE OR REPLACE FUNCTION bump_todo_version() RETURNS trigger AS $$ "
+            "BEGIN "
+            "IF TG_OP = 'INSERT' THEN "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id IN (SELECT owner_id FROM new_todos); "
+            "ELSIF TG_OP = 'DELETE' THEN "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id IN (SELECT owner_id FROM old_todos); "
+            "ELSE "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id IN (SELECT owner_id FROM old_todos "
+            "UNION SELECT owner_id FROM new_todos); "
+            "END IF; "
+            "RETURN NULL; "
+            "END $$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_version_insert AFTER INSERT ON todos "
+            "REFERENCING NEW TABLE AS new_todos "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_version_update AFTER UPDATE ON todos "
+            "REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_version_delete AFTER DELETE ON todos "
+            "REFERENCING OLD TABLE AS old_todos "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()"
+        )
+    elif op.get_bind().dialect.name == "sqlite":
+        op.execute(
+            "CREATE TRIGGER todos_version_insert AFTER INSERT ON todos BEGIN "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id = new.owner_id; END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_version_update AFTER UPDATE ON todos BEGIN "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id IN (old.owner_id, new.owner_id); END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_version_delete AFTER DELETE ON todos BEGIN "
+            "UPDATE users SET todo_version = todo_version + 1 "
+            "WHERE id = old.owner_id; END"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER todos_version_delete ON todos")
+        op.execute("DROP TRIGGER todos_version_update ON todos")
+        op.execute("DROP TRIGGER todos_version_insert ON todos")
+        op.execute("DROP FUNCTION bump_todo_version()")
+    elif op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER todos_version_delete")
+        op.execute("DROP TRIGGER todos_version_update")
+        op.execute("DROP TRIGGER todos_version_insert")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("todo_version")
@@ -0,0 +1,64 @@
+"""Serialization throughput of each JSON response backend on todo payloads.
+
+Renders a todo page of 10, 1k and 100k rows with every backend that is
+installed and reports the best time per render:
+
+    python benchmarks/json_serialization.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from responses import get_response_class  # noqa: E402
+
+
+def todo_page(rows):
+    return {
+        "items": [
+            {
+                "id": i,
+                "title": f"todo {i}",
+                "description": "benchmark todo with a realistic description",
+                "priority": i % 5 + 1,
+                "complete": i % 2 == 0,
+                "owner_id": 1,
+            }
+            for i in range(rows)
+        ],
+        "next_cursor": None,
+    }
+
+
+def main(args):
+    backends = []
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            backends.append((name, get_response_class(name)))
+        except ImportError:
+            print(f"{name} is not installed, skipped")
+
+    for rows in args.rows:
+        payload = todo_page(rows)
+        repeat = max(3, args.budget // max(rows, 1))
+        for name, response_class in backends:
+            response = response_class(None)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = response.render(payload)
+                best = min(best, time.perf_counter() - start)
+            print(
+                f"{rows:>7} rows  {name:<8} {best * 1000:9.3f} ms"
+                f"  {len(body) / best / 1e6:8.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--budget", type=int, default=200000)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""Encode and decode throughput of each JWT backend with RS256 signing keys.
+
+Every installed backend first has to pass the same test vectors: its tokens
+decode with every other backend, and tampered, expired and unknown-key tokens
+are rejected by all of them. Then the tokens per second are reported:
+
+    python benchmarks/jwt_codecs.py
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# the benchmarks run in one process and sign nothing that has to be shared
+os.environ.setdefault("TODOAPP_JWT_DEV_KEYS", "true")
+
+from signing_keys import KeyRing  # noqa: E402
+from token_codec import CODECS, InvalidTokenError  # noqa: E402
+
+
+def claims(expires_delta=timedelta(minutes=20)):
+    return {
+        "sub": "benchmark",
+        "id": 1,
+        "role": "admin",
+        "exp": datetime.utcnow() + expires_delta,
+    }
+
+
+def tamper(token):
+    header, payload, signature = token.split(".")
+    body = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    body["role"] = "owner"
+    payload = base64.urlsafe_b64encode(json.dumps(body).encode()).decode().rstrip("=")
+    return ".".join((header, payload, signature))
+
+
+def expect_rejected(codec, token, keyring, vector):
+    try:
+        codec.decode(token, keyring)
+    except InvalidTokenError:
+        return
+    raise AssertionError(f"{codec.name} accepted the {vector} token")
+
+
+def check_vectors(codecs, keyring, other_keyring):
+    for encoder in codecs:
+        token = encoder.encode(claims(), keyring.current)
+        for decoder in codecs:
+            payload = decoder.decode(token, keyring)
+            assert (
+                payload["sub"] == "benchmark" and payload["id"] == 1
+            ), f"{decoder.name} decoded a {encoder.name} token wrong"
+            expect_rejected(decoder, tamper(token), keyring, "tampered")
+            expect_rejected(
+                decoder,
+                encoder.encode(claims(timedelta(minutes=-1)), keyring.current),
+                keyring,
+                "expired",
+            )
+            expect_rejected(
+                decoder,
+                encoder.encode(claims(), other_keyring.current),
+                keyring,
+                "unknown key",
+            )
+            expect_rejected(decoder, "not.a.token", keyring, "malformed")
+
+
+def rate(function, budget):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < budget:
+        function()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main(args):
+    codecs = []
+    for name, codec_class in CODECS.items():
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            print(f"{name} is not installed, skipped")
+
+    keyring = KeyRing.generate()
+    check_vectors(codecs, keyring, KeyRing.generate())
+    print(f"{len(codecs)} backends passed the test vectors")
+
+    payload = claims()
+    for codec in codecs:
+        token = codec.encode(payload, keyring.current)
+        encodes = rate(lambda: codec.encode(payload, keyring.current), args.seconds)
+        decodes = rate(lambda: codec.decode(token, keyring), args.seconds)
+        print(
+            f"{codec.name:<8} encode {encodes:9.0f} tokens/s"
+            f"  decode {decodes:9.0f} tokens/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    main(parser.parse_args())
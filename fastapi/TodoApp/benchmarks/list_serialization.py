@@ -0,0 +1,76 @@
+"""Compare ORM hydration against column projection for a large todo list.
+
+Seeds a throwaway SQLite database with one user owning ``--rows`` todos,
+then times loading and serializing the whole list both ways:
+
+    python benchmarks/list_serialization.py --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# the benchmarks run in one process and sign nothing that has to be shared
+os.environ.setdefault("TODOAPP_JWT_DEV_KEYS", "true")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from models import Base, Todos, Users  # noqa: E402
+from routers.todos import todo_columns  # noqa: E402
+
+
+async def orm_hydration(db, owner_id):
+    result = await db.execute(select(Todos).where(Todos.owner_id == owner_id))
+    return json.dumps(jsonable_encoder(result.scalars().all())).encode()
+
+
+async def column_projection(db, owner_id):
+    result = await db.execute(select(*todo_columns).where(Todos.owner_id == owner_id))
+    return json.dumps([dict(row) for row in result.mappings()]).encode()
+
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Users), [{"id": 1, "username": "bench"}])
+        await connection.execute(
+            insert(Todos),
+            [
+                {
+                    "title": f"todo {i}",
+                    "description": "benchmark todo",
+                    "priority": i % 5 + 1,
+                    "complete": i % 2 == 0,
+                    "owner_id": 1,
+                }
+                for i in range(args.rows)
+            ],
+        )
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    for name, fn in [("orm", orm_hydration), ("projection", column_projection)]:
+        timings = []
+        for _ in range(args.repeat):
+            async with session_factory() as db:
+                start = time.perf_counter()
+                body = await fn(db, 1)
+                timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:<11} best {best * 1000:8.1f} ms  ({len(body)} bytes)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Concurrent load test for a running TodoApp instance.
+
+Logs in once, then fires ``--requests`` GET requests at ``--path`` with
+``--concurrency`` requests in flight, and reports throughput and latency
+percentiles. Run it against the app before and after a change, e.g.:
+
+    uvicorn main:app --workers 1
+    python benchmarks/load_test.py --username bench --password bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(client, username, password):
+    response = await client.post(
+        "/auth/token", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(args):
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=args.timeout
+    ) as client:
+        token = await login(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies = []
+        errors = 0
+        remaining = iter(range(args.requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(args.path, headers=headers)
+                except httpx.TransportError:
+                    # a stalled server shows up as errors, not a crash
+                    response = None
+                latencies.append(time.perf_counter() - start)
+                if response is None or response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"requests:    {len(latencies)} ({errors} errors)")
+    print(f"concurrency: {args.concurrency}")
+    print(f"req/sec:     {len(latencies) / elapsed:.1f}")
+    print(f"p50 (ms):    {statistics.median(latencies) * 1000:.2f}")
+    print(f"p99 (ms):    {percentile(latencies, 99) * 1000:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(run(parser.parse_args()))
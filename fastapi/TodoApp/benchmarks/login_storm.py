@@ -0,0 +1,70 @@
+"""Event loop responsiveness during a burst of password verifications.
+
+Runs ``--logins`` concurrent bcrypt verifications, first inline on the
+event loop and then through the worker pool in passwords.py, while a
+ticker measures how late the loop wakes it up:
+
+    python benchmarks/login_storm.py --logins 64
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import passwords  # noqa: E402
+
+TICK = 0.005
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def inline_verify(password, hashed_password):
+    return passwords.bcrypt_context.verify(password, hashed_password)
+
+
+async def storm(name, verify, logins, hashed_password):
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(verify("password", hashed_password) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+    lags.sort()
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(
+        f"{name:<7} {logins / elapsed:7.1f} logins/sec"
+        f"  loop lag median {statistics.median(lags) * 1000:7.1f} ms"
+        f"  p99 {p99 * 1000:7.1f} ms  max {lags[-1] * 1000:7.1f} ms"
+    )
+
+
+async def run(args):
+    hashed_password = passwords.bcrypt_context.hash("password")
+    await storm("inline", inline_verify, args.logins, hashed_password)
+    # warm the pool up so process start up isn't counted
+    await asyncio.gather(
+        *(
+            passwords.verify_password("password", hashed_password)
+            for _ in range(passwords.PASSWORD_WORKERS)
+        )
+    )
+    await storm("pool", passwords.verify_password, args.logins, hashed_password)
+    passwords.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
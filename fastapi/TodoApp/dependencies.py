@@ -0,0 +1,30 @@
+from typing import Annotated
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+
+
+async def get_db(request: Request):
+    # every router depends on this one function, and FastAPI caches a
+    # dependency per request, so a request never holds more than one session
+    # the session only checks a connection out of the pool when its first
+    # statement runs, so requests rejected before querying never touch the pool
+    # the request state lets the session keep a user's reads on the primary
+    # right after they wrote, see database.RoutingSession
+    async with SessionLocal(info={"request_state": request.state}) as db:
+        # yield keyword is used to create a generator function
+        # it allows to generate a sequence of values over time
+        yield db
+
+
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
+
+async def get_read_db(db: db_dependency):
+    # the same request session, marked for endpoints that only read
+    # their queries may be served by a read replica
+    db.info["read_only"] = True
+    return db
+
+
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
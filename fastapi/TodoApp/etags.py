@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import Response
+from sqlalchemy import select
+from models import Users
+
+
+# triggers on todos bump the version in the statement that writes, so the new
+# version and the new todos become visible together, see models.py
+async def get_todo_version(db, owner_id: int) -> int:
+    return await db.scalar(select(Users.todo_version).where(Users.id == owner_id))
+
+
+def make_etag(owner_id: int, version: int) -> str:
+    return f'"{owner_id}.{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = True) -> bool:
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    # "*" matches any current representation, so only when the resource exists
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return exists
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,15 +1,32 @@
 from fastapi import FastAPI
 import models
-from database import engine
-from routers import auth, todos, admin, users
+import passwords
+from database import engine, dispose_engines
+from responses import DefaultJSONResponse
+from routers import auth, todos, admin, users, internal, well_known
 
-app = FastAPI()
+# responses are rendered with a fast json serializer when one is installed
+app = FastAPI(default_response_class=DefaultJSONResponse)
+
+
+@app.on_event("startup")
+async def create_tables():
+    # create all tables in the database
+    # metadata.create_all is synchronous, so it is run through run_sync
+    async with engine.begin() as connection:
+        await connection.run_sync(models.Base.metadata.create_all)
+
+
+@app.on_event("shutdown")
+async def release_resources():
+    await dispose_engines()
+    passwords.shutdown()
 
-# create all tables in the database
-models.Base.metadata.create_all(bind=engine)
 
 # include the auth router
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
 app.include_router(users.router)
+app.include_router(internal.router)
+app.include_router(well_known.router)
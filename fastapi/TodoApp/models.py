@@ -1,5 +1,15 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+)
 
 
 class Users(Base):
@@ -13,6 +23,9 @@ class Users(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     role = Column(String)
+    # bumped by triggers on every write to the user's todos, the todo
+    # endpoints use it as their ETag, see etags.py
+    todo_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
 class Todos(Base):
@@ -25,3 +38,124 @@ class Todos(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+
+    # per user lookups filter on owner_id, these keep them off a full scan
+    # keep in sync with the migrations in alembic/versions
+    __table_args__ = (
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        # the list endpoint sorts by (priority, id) and filters on complete
+        Index("ix_todos_owner_id_priority_id", "owner_id", "priority", "id"),
+        # complete filter with the default id sort
+        Index("ix_todos_owner_id_complete_id", "owner_id", "complete", "id"),
+        Index(
+            "ix_todos_owner_id_complete_priority_id",
+            "owner_id",
+            "complete",
+            "priority",
+            "id",
+        ),
+        # text_pattern_ops lets postgres use the index for LIKE 'prefix%'
+        Index(
+            "ix_todos_owner_id_title",
+            "owner_id",
+            "title",
+            postgresql_ops={"title": "text_pattern_ops"},
+        ),
+    )
+
+
+# full text search over title and description, GET /todos/search
+# postgres keeps a generated tsvector column with a GIN index, sqlite keeps an
+# external content FTS5 table in sync with triggers, the column and table are
+# not mapped and only used through search.py
+# the GIN index leads with owner_id (btree_gin gives GIN the integer operators)
+# so a search only reads the entries of the user's own todos
+# keep in sync with the migrations in alembic/versions
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('english', coalesce(title, '') || ' ' || "
+    "coalesce(description, ''))) STORED",
+    "CREATE INDEX ix_todos_owner_id_search_vector "
+    "ON todos USING gin (owner_id, search_vector)",
+)
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_update AFTER UPDATE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+
+# every write to todos moves the owner's todo_version on inside the same
+# statement, so no write path has to remember it and it costs no round trip
+# postgres bumps each owner once per statement through the transition tables,
+# sqlite only has row triggers and bumps once per row
+# keep in sync with the migrations in alembic/versions
+POSTGRES_VERSION_DDL = (
+    "CREATE OR REPLACE FUNCTION bump_todo_version() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF TG_OP = 'INSERT' THEN "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id IN (SELECT owner_id FROM new_todos); "
+    "ELSIF TG_OP = 'DELETE' THEN "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id IN (SELECT owner_id FROM old_todos); "
+    "ELSE "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id IN (SELECT owner_id FROM old_todos "
+    "UNION SELECT owner_id FROM new_todos); "
+    "END IF; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER todos_version_insert AFTER INSERT ON todos "
+    "REFERENCING NEW TABLE AS new_todos "
+    "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()",
+    "CREATE TRIGGER todos_version_update AFTER UPDATE ON todos "
+    "REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos "
+    "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()",
+    "CREATE TRIGGER todos_version_delete AFTER DELETE ON todos "
+    "REFERENCING OLD TABLE AS old_todos "
+    "FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_version()",
+)
+SQLITE_VERSION_DDL = (
+    "CREATE TRIGGER todos_version_insert AFTER INSERT ON todos BEGIN "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id = new.owner_id; END",
+    "CREATE TRIGGER todos_version_update AFTER UPDATE ON todos BEGIN "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id IN (old.owner_id, new.owner_id); END",
+    "CREATE TRIGGER todos_version_delete AFTER DELETE ON todos BEGIN "
+    "UPDATE users SET todo_version = todo_version + 1 "
+    "WHERE id = old.owner_id; END",
+)
+
+for statement in POSTGRES_SEARCH_DDL + POSTGRES_VERSION_DDL:
+    event.listen(
+        Todos.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+for statement in SQLITE_SEARCH_DDL + SQLITE_VERSION_DDL:
+    event.listen(
+        Todos.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+
+
+class RefreshTokens(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # only the sha256 of the token is stored, the token itself goes to the client
+    token_hash = Column(String, unique=True, index=True)
+    expires_at = Column(DateTime)
+    revoked = Column(Boolean, default=False)
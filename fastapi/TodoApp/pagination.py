@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: dict) -> str:
+    # the cursor is opaque to clients, it only carries the sort key values
+    # of the last row on the page
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys=("id",)) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # a cursor from another sort order doesn't carry the right keys
+    if not isinstance(values, dict) or not all(
+        isinstance(values.get(key), int) for key in keys
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+async def paginate(
+    db, statement, key_columns, limit: int, after: str = None, descending=False
+):
+    """Return one keyset page of ``statement`` ordered by ``key_columns``.
+
+    The last key column has to be unique, usually the primary key, so the
+    order is total. Rows after the cursor are found through an index on the
+    key columns instead of being skipped with OFFSET, so every page costs the
+    same no matter how deep into the table it is.
+    """
+    keys = [column.key for column in key_columns]
+    if after is not None:
+        values = decode_cursor(after, keys)
+        # compare (a, b) > (x, y) as a row value so one index range scan
+        # picks up where the previous page stopped
+        position = tuple_(*key_columns)
+        bound = tuple_(*(values[key] for key in keys))
+        statement = statement.where(
+            position < bound if descending else position > bound
+        )
+    order_by = [column.desc() if descending else column for column in key_columns]
+    # fetch one extra row to know whether there is a next page
+    result = await db.execute(statement.order_by(*order_by).limit(limit + 1))
+    # statement selects plain columns, rows come back as dicts
+    items = [dict(row) for row in result.mappings()]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor({key: items[-1][key] for key in keys})
+    return {"items": items, "next_cursor": next_cursor}
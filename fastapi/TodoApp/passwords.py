@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt is cpu bound and holds the GIL, so it runs in worker processes
+# the pool never grows past this many processes, defaults to one per core
+PASSWORD_WORKERS = int(os.getenv("TODOAPP_PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn keeps the workers from inheriting the event loop and open
+        # database connections of the server process
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _hash(password: str) -> str:
+    return bcrypt_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return bcrypt_context.verify(password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _hash, password)
+
+
+async def hash_passwords(passwords: list) -> list:
+    # hashes a whole batch across all workers, PASSWORD_WORKERS at a time so
+    # logins sharing the pool only ever wait behind one round, not the batch
+    hashed_passwords = []
+    for start in range(0, len(passwords), PASSWORD_WORKERS):
+        hashed_passwords += await asyncio.gather(
+            *(
+                hash_password(password)
+                for password in passwords[start : start + PASSWORD_WORKERS]
+            )
+        )
+    return hashed_passwords
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), _verify, password, hashed_password
+    )
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,203 @@
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Annotated
+from fastapi import Depends, HTTPException, Request
+from starlette import status
+
+
+class RateLimitBackend(ABC):
+    """Counts requests per key.
+
+    ``hit`` records one request for ``key`` and returns 0 when it fits in
+    ``limit`` requests per ``window`` seconds, otherwise the number of
+    seconds the caller should wait before retrying.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Exact sliding window log, kept in this process only."""
+
+    # idle keys are swept out every this many hits
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        # key -> (hit timestamps, window), each key is swept with its own
+        # window since the limiters sharing the backend use different ones
+        self._logs = {}
+        self._since_sweep = 0
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        # sweep first, so the log of this key can't be dropped under it
+        self._sweep(now)
+        log = self._logs.get(key)
+        if log is None:
+            log = self._logs[key] = (deque(), window)
+        hits = log[0]
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) >= limit:
+            return hits[0] + window - now
+        hits.append(now)
+        return 0
+
+    def _sweep(self, now: float):
+        self._since_sweep += 1
+        if self._since_sweep < self.SWEEP_EVERY:
+            return
+        self._since_sweep = 0
+        idle = [
+            key
+            for key, (hits, window) in self._logs.items()
+            if not hits or hits[-1] <= now - window
+        ]
+        for key in idle:
+            del self._logs[key]
+
+
+class CounterStore(ABC):
+    """Shared store of expiring counters, e.g. Redis INCR + EXPIRE."""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> int:
+        pass
+
+
+class LocalCounterStore(CounterStore):
+    """In-process stand-in for a shared counter store."""
+
+    # expired counters are swept out every this many increments
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._counters = {}
+        self._since_sweep = 0
+
+    async def incr(self, key: str, ttl: float) -> int:
+        now = time.time()
+        self._sweep(now)
+        value, expires_at = self._counters.get(key, (0, 0))
+        if expires_at <= now:
+            value = 0
+        # like INCR + EXPIRE, every increment pushes the expiry out
+        self._counters[key] = (value + 1, now + ttl)
+        return value + 1
+
+    async def get(self, key: str) -> int:
+        value, expires_at = self._counters.get(key, (0, 0))
+        if expires_at <= time.time():
+            self._counters.pop(key, None)
+            return 0
+        return value
+
+    def _sweep(self, now: float):
+        # counters that are written once and never read again go too
+        self._since_sweep += 1
+        if self._since_sweep < self.SWEEP_EVERY:
+            return
+        self._since_sweep = 0
+        expired = [
+            key
+            for key, (value, expires_at) in self._counters.items()
+            if expires_at <= now
+        ]
+        for key in expired:
+            del self._counters[key]
+
+
+class SharedRateLimitBackend(RateLimitBackend):
+    """Sliding window counter on top of a CounterStore.
+
+    Keeps one counter per key and fixed window and weights the previous
+    window by how much of it still overlaps the sliding window, so every
+    worker sharing the store enforces the same limit with two counters
+    per key.
+    """
+
+    def __init__(self, store: CounterStore):
+        self.store = store
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.time()
+        current = int(now // window)
+        elapsed = now - current * window
+        count = await self.store.incr(f"{key}:{current}", ttl=window * 2)
+        previous = await self.store.get(f"{key}:{current - 1}")
+        if previous * (window - elapsed) / window + count > limit:
+            return window - elapsed
+        return 0
+
+
+def client_ip(request: Request) -> str:
+    # behind a proxy run uvicorn with --proxy-headers so this is the client
+    return request.client.host if request.client else "unknown"
+
+
+def default_backend() -> RateLimitBackend:
+    # memory or shared, shared uses the local stand-in store unless a real
+    # shared CounterStore is plugged in
+    if os.getenv("TODOAPP_RATE_LIMIT_BACKEND", "memory") == "shared":
+        return SharedRateLimitBackend(LocalCounterStore())
+    return MemoryRateLimitBackend()
+
+
+# shared by every limiter that isn't given its own backend
+rate_limit_backend = default_backend()
+
+
+class RateLimiter:
+    """Dependency that allows ``limit`` requests per ``window`` seconds.
+
+    Used directly as a dependency it keys on the client IP, ``per_user``
+    builds one that keys on the authenticated user instead.
+    """
+
+    def __init__(self, scope: str, limit: int, window: float, backend=None):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.backend = backend or rate_limit_backend
+
+    @classmethod
+    def from_env(cls, scope: str, default: str):
+        # TODOAPP_RATE_LIMIT_<SCOPE> is "<requests>/<seconds>", e.g. 10/60
+        setting = os.getenv(f"TODOAPP_RATE_LIMIT_{scope.upper()}", default)
+        limit, window = setting.split("/")
+        return cls(scope, int(limit), float(window))
+
+    async def check(self, key: str):
+        retry_after = await self.backend.hit(
+            f"{self.scope}:{key}", self.limit, self.window
+        )
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    async def __call__(self, request: Request):
+        await self.check(f"ip:{client_ip(request)}")
+
+    def per_user(self, get_current_user):
+        async def rate_limit_user(
+            request: Request, user: Annotated[dict, Depends(get_current_user)]
+        ):
+            # get_current_user is cached per request, so the endpoint reuses it
+            if user is None:
+                await self.check(f"ip:{client_ip(request)}")
+            else:
+                await self.check(f"user:{user.get('id')}")
+
+        return rate_limit_user
@@ -0,0 +1,25 @@
+import time
+from cache import LRUCache
+
+
+class ResponseCache:
+    """Rendered response bodies per owner, version and query.
+
+    The key carries the owner's ``todo_version``, which every write bumps in
+    its own transaction, so a cached body can't be served once the owner
+    wrote, on this worker or any other. Entries of older versions are never
+    looked up again and age out of the LRU, bounded in count and bytes.
+    """
+
+    def __init__(self, maxsize: int, maxbytes: int, ttl: float):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize, maxbytes)
+
+    def get(self, owner_id: int, version: int, query):
+        return self._entries.get((owner_id, version, query))
+
+    def set(self, owner_id: int, version: int, query, body: bytes):
+        self._entries.set((owner_id, version, query), body, time.time() + self.ttl)
+
+    def stats(self):
+        return self._entries.stats()
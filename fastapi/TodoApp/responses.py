@@ -0,0 +1,42 @@
+import os
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+# orjson, msgspec, json (stdlib) or auto, which picks the first one installed
+JSON_BACKEND = os.getenv("TODOAPP_JSON_BACKEND", "auto")
+
+
+class MsgspecJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        import msgspec
+
+        return msgspec.json.encode(content)
+
+
+def get_response_class(backend: str = JSON_BACKEND):
+    if backend == "auto":
+        for candidate in ("orjson", "msgspec"):
+            try:
+                __import__(candidate)
+            except ImportError:
+                continue
+            return get_response_class(candidate)
+        return JSONResponse
+    if backend == "orjson":
+        import orjson  # noqa: F401
+
+        return ORJSONResponse
+    if backend == "msgspec":
+        import msgspec  # noqa: F401
+
+        return MsgspecJSONResponse
+    if backend == "json":
+        return JSONResponse
+    raise ValueError(f"Unknown TODOAPP_JSON_BACKEND {backend!r}")
+
+
+# app wide default, also used by endpoints that build their response directly
+DefaultJSONResponse = get_response_class()
+
+# renders single values with the default backend, for bodies that are built
+# by hand such as the lines of a streamed ndjson export
+render_json = DefaultJSONResponse(None).render
@@ -1,37 +1,47 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Path
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
 from starlette import status
-from models import Todos
-from database import SessionLocal
-from .auth import get_current_user
+from models import RefreshTokens, Todos, Users
+from database import mark_write
+from dependencies import db_dependency, read_db_dependency
+from responses import DefaultJSONResponse
+from ratelimit import RateLimiter
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from user_import import IMPORT_FORMATS, import_users
+from .auth import get_current_user, invalidate_user_status
+from .todos import TodoPage, todo_columns
 
 router = APIRouter(
     prefix="/admin",
     tags=["admin"],
+    dependencies=[
+        Depends(RateLimiter.from_env("admin", "300/60").per_user(get_current_user))
+    ],
 )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        # yield keyword is used to create a generator function
-        # it allows to generate a sequence of values over time
-        yield db
-    finally:
-        db.close()
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+class UserStatusRequest(BaseModel):
+    is_active: bool
+    role: str
 
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get("/todo", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentication failed")
-    return db.query(Todos).all()
+    page = await paginate(db, select(*todo_columns), (Todos.id,), limit, after)
+    return DefaultJSONResponse(page)
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -41,8 +51,73 @@ async def delete_todo(
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
-    if todo_model is None:
+    # the owner comes back too, their reads have to see the delete
+    deleted = (
+        await db.execute(
+            delete(Todos)
+            .where(Todos.id == todo_id)
+            .returning(Todos.id, Todos.owner_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    db.delete(todo_model)
-    db.commit()
+    await db.commit()
+    # the owner's next reads go to the primary, not a replica that still has
+    # the todo, the session only does this for the admin who wrote
+    await mark_write(deleted.owner_id)
+
+
+@router.put("/user/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def update_user_status(
+    user: user_dependency,
+    db: db_dependency,
+    user_status_request: UserStatusRequest,
+    user_id: int = Path(gt=0),
+):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+    updated_id = await db.scalar(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(**user_status_request.dict())
+        .returning(Users.id)
+        .execution_options(synchronize_session=False)
+    )
+    if updated_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if not user_status_request.is_active:
+        # a deactivated user can't get new access tokens either
+        await db.execute(
+            update(RefreshTokens)
+            .where(RefreshTokens.user_id == user_id)
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    # the cached status would keep the user in for up to the cache ttl
+    await invalidate_user_status(user_id)
+
+
+@router.post("/users/import", status_code=status.HTTP_200_OK)
+async def import_user_file(
+    user: user_dependency,
+    db: db_dependency,
+    file: UploadFile,
+    file_format: Optional[str] = Query(default=None, alias="format"),
+):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+    # the format comes from the file name unless it is given explicitly
+    if file_format is None:
+        file_format = "csv" if (file.filename or "").endswith(".csv") else "jsonl"
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported import format")
+
+    # progress is streamed as one json line per batch while the import runs
+    return StreamingResponse(
+        import_users(db, file, file_format), media_type="application/x-ndjson"
+    )
@@ -1,29 +1,68 @@
+import hashlib
+import os
+import secrets
+import time
 from datetime import datetime, timedelta
-from typing import Annotated
+from typing import Annotated, Optional
 from typing_extensions import deprecated
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from database import SessionLocal
-from sqlalchemy.orm import Session
+from admission import AdmissionLimiter
+from cache import LRUCache
+from ratelimit import CounterStore, LocalCounterStore, RateLimiter
+from dependencies import db_dependency
+from sqlalchemy import delete, select, update
 from starlette import status
-from models import Users
-from passlib.context import CryptContext
+from models import RefreshTokens, Users
+from passwords import PASSWORD_WORKERS, hash_password, verify_password
+from signing_keys import keyring
+from token_codec import InvalidTokenError, codec
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import JWTError, jwt
 
 router = APIRouter(
     # this will add /auth to the beginning of all paths defined in this router
     prefix="/auth",
     tags=["auth"],
+    # nobody is logged in yet here, so these requests are limited per client ip
+    dependencies=[Depends(RateLimiter.from_env("auth", "20/60"))],
 )
 
-SECRET_KEY = "secret"
-ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=20)
+# refresh tokens are exchanged for new access tokens without a password
+REFRESH_TOKEN_EXPIRE = timedelta(
+    days=int(os.getenv("TODOAPP_REFRESH_TOKEN_DAYS", "14"))
+)
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # tokenUrl is the endpoint where the user will send their username and password
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# verified token claims, keyed by the sha256 digest of the token and kept
+# until the token expires, so repeat requests skip signature verification
+token_cache = LRUCache(maxsize=int(os.getenv("TODOAPP_TOKEN_CACHE_SIZE", "10000")))
+
+# user id -> (is_active, role), so deactivated users and role changes are
+# honoured without a query per request, entries live USER_STATUS_TTL seconds
+USER_STATUS_TTL = float(os.getenv("TODOAPP_USER_STATUS_TTL", "5"))
+user_status_cache = LRUCache(
+    maxsize=int(os.getenv("TODOAPP_USER_STATUS_CACHE_SIZE", "10000"))
+)
+# users whose status changed in the last USER_STATUS_TTL seconds, for them the
+# cache is skipped, so entries cached before the change by any worker are
+# never used, the local store only covers this worker, with more plug in a
+# shared CounterStore
+status_changes: CounterStore = LocalCounterStore()
+
+# endpoints that run bcrypt share one limiter, so a burst of logins waits
+# for the password workers instead of starving the rest of the api
+password_admission = AdmissionLimiter(
+    max_concurrency=int(
+        os.getenv("TODOAPP_PASSWORD_CONCURRENCY", str(PASSWORD_WORKERS))
+    ),
+    max_queue=int(os.getenv("TODOAPP_PASSWORD_QUEUE", str(PASSWORD_WORKERS * 4))),
+    queue_timeout=float(os.getenv("TODOAPP_PASSWORD_QUEUE_TIMEOUT", "5")),
+    retry_after=int(os.getenv("TODOAPP_PASSWORD_RETRY_AFTER", "1")),
+)
+
 
 class CreateUserRequest(BaseModel):
     # we are leaving id and is_active out because they are auto generated
@@ -38,27 +77,20 @@ class CreateUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        # yield keyword is used to create a generator function
-        # it allows to generate a sequence of values over time
-        yield db
-    finally:
-        db.close()
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-
-
-def authenticate_user(username: str, password: str, db):
-    user = db.query(Users).filter(Users.username == username).first()
-    if not user:
+async def authenticate_user(username: str, password: str, db):
+    user = await db.scalar(select(Users).where(Users.username == username))
+    if not user or not user.is_active:
         return False
     # verify the password
-    if not bcrypt_context.verify(password, user.hashed_password):
+    # bcrypt runs in a worker process so the event loop keeps serving requests
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -69,12 +101,79 @@ def create_access_token(
     encode = {"sub": username, "id": user_id, "role": role}
     expires = datetime.utcnow() + expires_delta
     encode.update({"exp": expires})
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    # tokens are signed with the current private key, the kid header tells
+    # verifiers which public key from /.well-known/jwks.json to check it with
+    # the jwt library doing the work is picked by TODOAPP_JWT_BACKEND
+    return codec.encode(encode, keyring.current)
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    # refresh tokens are long random strings, a plain sha256 is enough and
+    # keeps the lookup free of bcrypt work
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def create_refresh_token(user_id: int, db) -> str:
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshTokens(
+            user_id=user_id,
+            token_hash=hash_refresh_token(refresh_token),
+            expires_at=datetime.utcnow() + REFRESH_TOKEN_EXPIRE,
+            revoked=False,
+        )
+    )
+    return refresh_token
+
+
+async def purge_refresh_tokens(user_id: int, db):
+    # every login and refresh adds a row, so the user's expired ones are
+    # dropped each time, revoked rows stay until they expire because they
+    # are what detects a replayed token in refresh_access_token
+    await db.execute(
+        delete(RefreshTokens)
+        .where(RefreshTokens.user_id == user_id)
+        .where(RefreshTokens.expires_at <= datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+async def get_user_status(user_id: int, db):
+    user_status = None
+    if not await status_changes.get(f"user_status:{user_id}"):
+        user_status = user_status_cache.get(user_id)
+    if user_status is None:
+        row = (
+            await db.execute(
+                select(Users.is_active, Users.role).where(Users.id == user_id)
+            )
+        ).first()
+        user_status = (row.is_active, row.role) if row else (False, None)
+        user_status_cache.set(user_id, user_status, time.time() + USER_STATUS_TTL)
+        # end the read transaction so the connection goes back to the pool
+        # until the endpoint runs its own queries
+        await db.rollback()
+    return user_status
+
+
+async def invalidate_user_status(user_id: int):
+    user_status_cache.invalidate(user_id)
+    await status_changes.incr(f"user_status:{user_id}", ttl=USER_STATUS_TTL)
+
+
+async def get_current_user(
+    request: Request, token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency
+):
+    token_digest = hashlib.sha256(token.encode()).digest()
+    user = token_cache.get(token_digest)
+    if user is None:
+        try:
+            payload = codec.decode(token, keyring)
+        except InvalidTokenError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get("role")
@@ -85,42 +184,118 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
                 detail="Could not validate credentials",
             )
 
-        return {"username": username, "id": user_id, "user_role": user_role}
-    except JWTError:
+        user = {"username": username, "id": user_id, "user_role": user_role}
+        # codec.decode already rejected expired tokens, the claims stay cached
+        # until the exp claim so the cache never outlives the token
+        if payload.get("exp") is not None:
+            token_cache.set(token_digest, user, payload["exp"])
+
+    is_active, role = await get_user_status(user["id"], db)
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
 
+    # lets the database session route this user's reads, see database.py
+    request.state.user_id = user["id"]
+    # handlers get their own copy, the cached claims stay untouched, and the
+    # role comes from the user row so a role change applies immediately
+    return {**user, "user_role": role}
+
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(db: db_dependency, create_user_request: CreateUserRequest):
+    async with password_admission.slot():
+        hashed_password = await hash_password(create_user_request.password)
+
     create_user_model = Users(
         email=create_user_request.email,
         username=create_user_request.username,
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=create_user_request.role,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=hashed_password,
         is_active=True,
     )
 
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
 
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    async with password_admission.slot():
+        user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
-    token = create_access_token(
-        user.username, user.id, user.role, timedelta(minutes=20)
+    token = create_access_token(user.username, user.id, user.role, ACCESS_TOKEN_EXPIRE)
+    await purge_refresh_tokens(user.id, db)
+    refresh_token = create_refresh_token(user.id, db)
+    await db.commit()
+
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_request: RefreshRequest, db: db_dependency):
+    token_hash = hash_refresh_token(refresh_request.refresh_token)
+
+    # revoke the presented token and get its user in one statement
+    # the revoked check makes sure two concurrent refreshes can't both win
+    user_id = await db.scalar(
+        update(RefreshTokens)
+        .where(RefreshTokens.token_hash == token_hash)
+        .where(RefreshTokens.revoked == False)  # noqa: E712
+        .where(RefreshTokens.expires_at > datetime.utcnow())
+        .values(revoked=True)
+        .returning(RefreshTokens.user_id)
+        .execution_options(synchronize_session=False)
     )
+    if user_id is None:
+        # a token that was already rotated is being replayed, it may have been
+        # stolen, so every refresh token of that user is revoked
+        reused_by = await db.scalar(
+            select(RefreshTokens.user_id)
+            .where(RefreshTokens.token_hash == token_hash)
+            .where(RefreshTokens.revoked == True)  # noqa: E712
+        )
+        if reused_by is not None:
+            await db.execute(
+                update(RefreshTokens)
+                .where(RefreshTokens.user_id == reused_by)
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    user = await db.scalar(select(Users).where(Users.id == user_id))
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    token = create_access_token(user.username, user.id, user.role, ACCESS_TOKEN_EXPIRE)
+    await purge_refresh_tokens(user.id, db)
+    refresh_token = create_refresh_token(user.id, db)
+    await db.commit()
 
-    return {"access_token": token, "token_type": "bearer"}
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
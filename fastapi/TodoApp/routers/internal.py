@@ -0,0 +1,41 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+from database import pool_status
+from .auth import get_current_user, password_admission, token_cache, user_status_cache
+from .todos import todo_list_cache
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+)
+
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def read_pool(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    # checked out, idle and overflow connections plus checkout wait times
+    return pool_status()
+
+
+@router.get("/caches", status_code=status.HTTP_200_OK)
+async def read_caches(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    # size and hit/miss counters of the in-process caches
+    return {
+        "tokens": token_cache.stats(),
+        "user_status": user_status_cache.stats(),
+        "todo_lists": todo_list_cache.stats(),
+    }
+
+
+@router.get("/admission", status_code=status.HTTP_200_OK)
+async def read_admission(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    # queue depth and rejections of the password endpoints
+    return {"password": password_admission.stats()}
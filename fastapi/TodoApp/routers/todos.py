@@ -1,26 +1,48 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Path
+import csv
+import io
+import os
+from collections import defaultdict, deque
+from typing import Annotated, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, literal, select, union_all, update
 from starlette import status
 from models import Todos
-from database import SessionLocal
+from dependencies import db_dependency, read_db_dependency
+from responses import DefaultJSONResponse, render_json
+from ratelimit import RateLimiter
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from search import search_statement
+from etags import (
+    etag_matches,
+    get_todo_version,
+    make_etag,
+    not_modified,
+)
+from response_cache import ResponseCache
 from .auth import get_current_user
 
-router = APIRouter()
+router = APIRouter(
+    dependencies=[
+        Depends(RateLimiter.from_env("todos", "300/60").per_user(get_current_user))
+    ]
+)
 
+# largest number of items accepted by the bulk endpoints
+MAX_BATCH_SIZE = int(os.getenv("TODOAPP_MAX_BATCH_SIZE", "100"))
 
-def get_db():
-    db = SessionLocal()
-    try:
-        # yield keyword is used to create a generator function
-        # it allows to generate a sequence of values over time
-        yield db
-    finally:
-        db.close()
+# rows fetched from the database cursor per round trip by the export
+EXPORT_BATCH_SIZE = int(os.getenv("TODOAPP_EXPORT_BATCH_SIZE", "1000"))
 
+# rendered GET / pages per user, todo version and query, a write bumps the
+# version so its pages are never served again by any worker
+todo_list_cache = ResponseCache(
+    maxsize=int(os.getenv("TODOAPP_LIST_CACHE_SIZE", "10000")),
+    maxbytes=int(os.getenv("TODOAPP_LIST_CACHE_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("TODOAPP_LIST_CACHE_TTL", "30")),
+)
 
-db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
@@ -31,32 +53,213 @@ class TodoRequest(BaseModel):
     complete: bool
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+class TodoUpdateRequest(TodoRequest):
+    id: int = Field(gt=0)
+
+
+class TodoDeleteRequest(BaseModel):
+    ids: List[int]
+
+
+class BulkItemResult(BaseModel):
+    id: Optional[int]
+    status: int
+
+
+class BulkResponse(BaseModel):
+    results: List[BulkItemResult]
+
+
+class TodoResponse(BaseModel):
+    id: int
+    title: str
+    description: str
+    priority: int
+    complete: bool
+    owner_id: int
+
+
+class TodoPage(BaseModel):
+    items: List[TodoResponse]
+    next_cursor: Optional[str]
+
+
+# list endpoints select only these columns instead of whole ORM objects
+todo_columns = (
+    Todos.id,
+    Todos.title,
+    Todos.description,
+    Todos.priority,
+    Todos.complete,
+    Todos.owner_id,
+)
+
+
+# sort query value -> (keyset columns, descending), id comes last to break ties
+sort_orders = {
+    "id": ((Todos.id,), False),
+    "-id": ((Todos.id,), True),
+    "priority": ((Todos.priority, Todos.id), False),
+    "-priority": ((Todos.priority, Todos.id), True),
+}
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(
+    user: user_dependency,
+    db: read_db_dependency,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    complete: Optional[bool] = None,
+    priority_min: Optional[int] = Query(default=None, gt=0, lt=6),
+    priority_max: Optional[int] = Query(default=None, gt=0, lt=6),
+    title_prefix: Optional[str] = Query(default=None, min_length=1, max_length=100),
+    sort: Literal["id", "-id", "priority", "-priority"] = "id",
+    if_none_match: Optional[str] = Header(default=None),
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+
+    # an unchanged list costs one primary key lookup instead of the page query
+    version = await get_todo_version(db, user.get("id"))
+    etag = make_etag(user.get("id"), version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # so does a page rendered earlier at the same version
+    query = (limit, after, complete, priority_min, priority_max, title_prefix, sort)
+    body = todo_list_cache.get(user.get("id"), version, query)
+    if body is not None:
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    # the filters run in sql, backed by the owner_id indexes in models.py
+    statement = select(*todo_columns).where(Todos.owner_id == user.get("id"))
+    if complete is not None:
+        statement = statement.where(Todos.complete == complete)
+    if priority_min is not None:
+        statement = statement.where(Todos.priority >= priority_min)
+    if priority_max is not None:
+        statement = statement.where(Todos.priority <= priority_max)
+    if title_prefix is not None:
+        # LIKE 'prefix%', case sensitive on postgres and sqlite (see database.py),
+        # autoescape keeps % and _ literal
+        statement = statement.where(
+            Todos.title.startswith(title_prefix, autoescape=True)
+        )
+
+    # get one page of the user's todos, pass next_cursor as after for the next
+    # the cursor holds the sort key too, so it only works with the same sort
+    key_columns, descending = sort_orders[sort]
+    page = await paginate(db, statement, key_columns, limit, after, descending)
+    # the rows are already plain dicts, so they are rendered straight to json
+    # skipping response_model validation and jsonable_encoder
+    response = DefaultJSONResponse(page, headers={"ETag": etag})
+    # the rows are read after the version and from the same database (see
+    # database.RoutingSession), so they are never older than it
+    todo_list_cache.set(user.get("id"), version, query, response.body)
+    return response
+
+
+@router.get("/todos/search", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def search_todos(
+    user: user_dependency,
+    db: read_db_dependency,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    if not q.split():
+        return DefaultJSONResponse({"items": [], "next_cursor": None})
+
+    # best matches first, the cursor carries the score of the last match
+    statement, score = search_statement(todo_columns, q)
+    page = await paginate(
+        db,
+        statement.where(Todos.owner_id == user.get("id")),
+        (score, Todos.id),
+        limit,
+        after,
+        descending=True,
+    )
+    for item in page["items"]:
+        del item["score"]
+    return DefaultJSONResponse(page)
+
+
+@router.get("/todos/export", status_code=status.HTTP_200_OK)
+async def export_todos(
+    user: user_dependency,
+    db: read_db_dependency,
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    # get all todos from the database
-    return db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
+
+    fieldnames = [column.key for column in todo_columns]
+
+    async def export_rows():
+        if export_format == "csv":
+            # the header goes out before the query runs
+            yield ",".join(fieldnames) + "\r\n"
+        # a server side cursor, rows arrive EXPORT_BATCH_SIZE at a time and
+        # each batch is sent before the next one is fetched, so memory stays
+        # flat however many todos the user has
+        result = await db.stream(
+            select(*todo_columns)
+            .where(Todos.owner_id == user.get("id"))
+            .order_by(Todos.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        try:
+            async for rows in result.mappings().partitions():
+                if export_format == "csv":
+                    buffer = io.StringIO()
+                    csv.DictWriter(buffer, fieldnames).writerows(rows)
+                    yield buffer.getvalue()
+                else:
+                    yield b"".join(render_json(dict(row)) + b"\n" for row in rows)
+        finally:
+            await result.close()
+
+    return StreamingResponse(
+        export_rows(),
+        media_type="text/csv" if export_format == "csv" else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="todos.{export_format}"'
+        },
+    )
 
 
 @router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
 async def read_todo(
-    user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)
+    user: user_dependency,
+    db: read_db_dependency,
+    response: Response,
+    todo_id: int = Path(gt=0),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
-    )
-    if todo_model is not None:
-        return todo_model
+    # the version covers all todos of the user, so it is valid for each one
+    # a concrete tag can answer without loading the todo, "*" can not
+    etag = make_etag(user.get("id"), await get_todo_version(db, user.get("id")))
+    if etag_matches(if_none_match, etag, exists=False):
+        return not_modified(etag)
 
+    todo_model = await db.scalar(
+        select(Todos).where(Todos.id == todo_id).where(Todos.owner_id == user.get("id"))
+    )
     # if todo with the given id is not found, return 404
-    raise HTTPException(status_code=404, detail="Todo not found")
+    if todo_model is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return todo_model
 
 
 @router.post("/todo", status_code=status.HTTP_201_CREATED)
@@ -74,7 +277,7 @@ async def create_todo(
 
     # add the todo to the database
     db.add(todo_model)
-    db.commit()
+    await db.commit()
 
 
 @router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -88,23 +291,20 @@ async def update_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    # update the todo with the new values in a single statement
+    # RETURNING gives back the id only if a row of this user matched
+    updated_id = await db.scalar(
+        update(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
+        .values(**todo_request.dict())
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
     )
-    if todo_model is None:
+    if updated_id is None:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    # update the todo_model with the new values
-    todo_model.title = todo_request.title
-    todo_model.description = todo_request.description
-    todo_model.priority = todo_request.priority
-    todo_model.complete = todo_request.complete
-
-    db.add(todo_model)
-    db.commit()
+    await db.commit()
 
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -114,14 +314,144 @@ async def delete_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    todo_model = (
-        db.query(Todos)
-        .filter(Todos.id == todo_id)
-        .filter(Todos.owner_id == user.get("id"))
-        .first()
+    deleted_id = await db.scalar(
+        delete(Todos)
+        .where(Todos.id == todo_id)
+        .where(Todos.owner_id == user.get("id"))
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
     )
-    if todo_model is None:
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    db.delete(todo_model)
-    db.commit()
+    await db.commit()
+
+
+# the TodoRequest fields in declaration order, see create_todos and update_todos
+request_columns = [getattr(Todos, name) for name in TodoRequest.__fields__]
+
+
+def check_batch_size(items: list):
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {MAX_BATCH_SIZE} items",
+        )
+
+
+@router.post(
+    "/todos/bulk", status_code=status.HTTP_201_CREATED, response_model=BulkResponse
+)
+async def create_todos(
+    user: user_dependency, db: db_dependency, todo_requests: List[TodoRequest]
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    check_batch_size(todo_requests)
+    if not todo_requests:
+        return {"results": []}
+
+    # one multi-row INSERT, RETURNING does not promise the rows come back in
+    # the order of the values, so each row is matched back to its request by
+    # the inserted values, requests with equal values are interchangeable
+    result = await db.execute(
+        insert(Todos)
+        .values(
+            [
+                {**todo_request.dict(), "owner_id": user.get("id")}
+                for todo_request in todo_requests
+            ]
+        )
+        .returning(Todos.id, *request_columns)
+    )
+    # equal requests get their ids in ascending order
+    ids_by_values = defaultdict(deque)
+    for todo_id, *values in sorted(result):
+        ids_by_values[tuple(values)].append(todo_id)
+    results = [
+        {
+            "id": ids_by_values[tuple(todo_request.dict().values())].popleft(),
+            "status": 201,
+        }
+        for todo_request in todo_requests
+    ]
+    await db.commit()
+    return {"results": results}
+
+
+@router.put("/todos/bulk", status_code=status.HTTP_200_OK, response_model=BulkResponse)
+async def update_todos(
+    user: user_dependency, db: db_dependency, todo_requests: List[TodoUpdateRequest]
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    check_batch_size(todo_requests)
+    if not todo_requests:
+        return {"results": []}
+
+    # one UPDATE ... FROM joined with the new values, RETURNING gives back the
+    # ids that exist and belong to the user and the others are not found, so
+    # a todo deleted in the meantime is never reported as updated
+    # a repeated id keeps its last values, as if the requests ran in order
+    latest = {todo_request.id: todo_request.dict() for todo_request in todo_requests}
+    new_values = union_all(
+        *(
+            select(
+                *(
+                    literal(value, Todos.__table__.c[name].type).label(name)
+                    for name, value in todo.items()
+                )
+            )
+            for todo in latest.values()
+        )
+    ).cte("new_values")
+    result = await db.execute(
+        update(Todos)
+        .where(Todos.id == new_values.c.id)
+        .where(Todos.owner_id == user.get("id"))
+        .values({column: new_values.c[column.key] for column in request_columns})
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated_ids = set(result.scalars())
+    await db.commit()
+
+    return {
+        "results": [
+            {
+                "id": todo_request.id,
+                "status": 204 if todo_request.id in updated_ids else 404,
+            }
+            for todo_request in todo_requests
+        ]
+    }
+
+
+@router.post(
+    "/todos/bulk/delete", status_code=status.HTTP_200_OK, response_model=BulkResponse
+)
+async def delete_todos(
+    user: user_dependency, db: db_dependency, delete_request: TodoDeleteRequest
+):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    check_batch_size(delete_request.ids)
+    if not delete_request.ids:
+        return {"results": []}
+
+    result = await db.execute(
+        delete(Todos)
+        .where(Todos.id.in_(delete_request.ids))
+        .where(Todos.owner_id == user.get("id"))
+        .returning(Todos.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_ids = set(result.scalars())
+    await db.commit()
+
+    return {
+        "results": [
+            {"id": todo_id, "status": 204 if todo_id in deleted_ids else 404}
+            for todo_id in delete_request.ids
+        ]
+    }
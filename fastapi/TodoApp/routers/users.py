@@ -1,32 +1,22 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Path
-from passlib.context import CryptContext
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 from starlette import status
-from models import Users
-from database import SessionLocal
-from .auth import get_current_user
+from models import RefreshTokens, Users
+from dependencies import db_dependency, read_db_dependency
+from ratelimit import RateLimiter
+from passwords import hash_password, verify_password
+from .auth import get_current_user, invalidate_user_status, password_admission
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
+    dependencies=[
+        Depends(RateLimiter.from_env("users", "60/60").per_user(get_current_user))
+    ],
 )
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        # yield keyword is used to create a generator function
-        # it allows to generate a sequence of values over time
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
@@ -36,11 +26,11 @@ class UserVerification(BaseModel):
 
 
 @router.get("/get_user", status_code=status.HTTP_200_OK)
-async def read_user(user: user_dependency, db: db_dependency):
+async def read_user(user: user_dependency, db: read_db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    return db.query(Users).filter(Users.id == user.get("id")).first()
+    return await db.scalar(select(Users).where(Users.id == user.get("id")))
 
 
 @router.put("/change_password", status_code=status.HTTP_204_NO_CONTENT)
@@ -50,18 +40,30 @@ async def update_todo(
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
-    user_model = db.query(Users).filter(Users.id == user.get("id")).first()
-    if user_model is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    # the slot is taken before the query, so requests waiting in the queue
+    # don't hold a pooled connection the rest of the api needs
+    async with password_admission.slot():
+        user_model = await db.scalar(select(Users).where(Users.id == user.get("id")))
+        if user_model is None:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    # verify the user password
-    if not bcrypt_context.verify(
-        user_verification.password, user_model.hashed_password
-    ):
-        raise HTTPException(status_code=401, detail="Error on password change")
+        # verify the user password
+        if not await verify_password(
+            user_verification.password, user_model.hashed_password
+        ):
+            raise HTTPException(status_code=401, detail="Error on password change")
 
-    # update the user password
-    user_model.hashed_password = bcrypt_context.hash(user_verification.new_password)
+        # update the user password
+        user_model.hashed_password = await hash_password(user_verification.new_password)
 
     db.add(user_model)
-    db.commit()
+    # refresh tokens issued with the old password stop working, a stolen one
+    # can't keep minting access tokens
+    await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.user_id == user_model.id)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate_user_status(user_model.id)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from signing_keys import JWKS_MAX_AGE, keyring
+
+router = APIRouter(
+    prefix="/.well-known",
+    tags=["well-known"],
+)
+
+
+@router.get("/jwks.json")
+async def read_jwks(response: Response):
+    # public keys other services use to verify our tokens locally
+    # a new key only signs once this cache has expired, see signing_keys.py
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE}"
+    return keyring.jwks()
@@ -0,0 +1,39 @@
+from sqlalchemy import Integer, cast, column, func, literal_column, select, table
+from database import engine
+from models import Todos
+
+# ranks are floats, they are scaled to integers so (score, id) can be used as
+# a keyset cursor without float rounding between pages
+SCORE_SCALE = 1000000
+
+todos_fts = table("todos_fts", column("rowid"))
+
+
+def search_statement(columns, q: str):
+    """Return ``(statement, score)`` selecting ``columns`` of todos matching q.
+
+    ``score`` is the labelled rank, higher is better. Postgres matches the
+    generated ``search_vector`` column through its GIN index, sqlite the
+    ``todos_fts`` FTS5 table, both are created in models.py.
+    """
+    if engine.dialect.name == "postgresql":
+        # websearch_to_tsquery accepts any user input without syntax errors
+        # the config is inlined, a bound parameter would be sent as text
+        query = func.websearch_to_tsquery(literal_column("'english'"), q)
+        search_vector = literal_column("todos.search_vector")
+        score = cast(func.ts_rank_cd(search_vector, query) * SCORE_SCALE, Integer)
+        score = score.label("score")
+        statement = select(*columns, score).where(search_vector.op("@@")(query))
+    else:
+        # every word is quoted as an fts5 string, so operators in q are just
+        # searched for, and all words have to match
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+        # bm25 is lower for better matches
+        score = cast(-func.bm25(literal_column("todos_fts")) * SCORE_SCALE, Integer)
+        score = score.label("score")
+        statement = (
+            select(*columns, score)
+            .join(todos_fts, todos_fts.c.rowid == Todos.id)
+            .where(literal_column("todos_fts").op("MATCH")(match))
+        )
+    return statement, score
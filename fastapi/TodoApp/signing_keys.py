@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ALGORITHM = "RS256"
+
+# directory holding the private signing keys as PEM files, ordered by file
+# name, so name them to sort in rotation order, e.g. 2026-10-18.pem
+# the last file signs new tokens and the older ones still verify the tokens
+# they signed
+# to rotate, add a new key file, restart, and delete the old file once the
+# tokens it signed have expired, it keeps signing for JWKS_MAX_AGE after
+# each restart
+JWT_KEYS_DIR = os.getenv("TODOAPP_JWT_KEYS_DIR")
+# how long other services may cache the JWKS, a new key is published right
+# away but only signs once it has been published this long, so no service
+# sees a kid its cached JWKS doesn't have
+JWKS_MAX_AGE = int(os.getenv("TODOAPP_JWKS_MAX_AGE", "300"))
+# without a keys directory every process would sign with its own random key
+# and reject the tokens of the other workers, so that fallback has to be
+# asked for, and is only fit for a single worker dev server
+JWT_DEV_KEYS = os.getenv("TODOAPP_JWT_DEV_KEYS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class SigningKey:
+    def __init__(self, private_pem: bytes):
+        private_key = serialization.load_pem_private_key(private_pem, password=None)
+        numbers = private_key.public_key().public_numbers()
+        self.public_jwk = {
+            "kty": "RSA",
+            "n": _b64url_uint(numbers.n),
+            "e": _b64url_uint(numbers.e),
+        }
+        # the kid is the RFC 7638 thumbprint, stable for a given key
+        thumbprint = hashlib.sha256(
+            json.dumps(self.public_jwk, sort_keys=True, separators=(",", ":")).encode()
+        ).digest()
+        self.kid = base64.urlsafe_b64encode(thumbprint).decode().rstrip("=")
+        self.public_jwk.update({"kid": self.kid, "use": "sig", "alg": ALGORITHM})
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.private_pem = private_pem
+        self.public_pem = self.public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+
+
+class KeyRing:
+    def __init__(self, keys: list):
+        # keys are ordered oldest first, all of them are published
+        self._keys = {key.kid: key for key in keys}
+        self._newest = keys[-1]
+        self._previous = keys[-2] if len(keys) > 1 else None
+        self.published_at = time.monotonic()
+
+    @property
+    def current(self):
+        # the newest key signs once it has been in the JWKS for JWKS_MAX_AGE,
+        # until then the key before it keeps signing
+        if (
+            self._previous is None
+            or time.monotonic() - self.published_at >= JWKS_MAX_AGE
+        ):
+            return self._newest
+        return self._previous
+
+    @classmethod
+    def from_directory(cls, path: str):
+        files = sorted(
+            (
+                os.path.join(path, name)
+                for name in os.listdir(path)
+                if name.endswith(".pem")
+            ),
+        )
+        if not files:
+            raise RuntimeError(f"No .pem signing keys found in {path}")
+        keys = []
+        for file in files:
+            with open(file, "rb") as pem:
+                keys.append(SigningKey(pem.read()))
+        return cls(keys)
+
+    @classmethod
+    def generate(cls):
+        # a throwaway key for local runs, tokens don't survive a restart and
+        # are not shared between workers
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        return cls([SigningKey(private_pem)])
+
+    def get(self, kid: str):
+        return self._keys.get(kid)
+
+    def jwks(self):
+        return {"keys": [key.public_jwk for key in self._keys.values()]}
+
+
+def load_keyring() -> KeyRing:
+    if JWT_KEYS_DIR:
+        return KeyRing.from_directory(JWT_KEYS_DIR)
+    if not JWT_DEV_KEYS:
+        raise RuntimeError(
+            "TODOAPP_JWT_KEYS_DIR is not set, point it to a directory of .pem "
+            "signing keys shared by all workers, or set TODOAPP_JWT_DEV_KEYS=true "
+            "to sign with a throwaway key on a single worker dev server"
+        )
+    logger.warning(
+        "TODOAPP_JWT_DEV_KEYS is set, signing tokens with a throwaway key of "
+        "this process, tokens are rejected by other workers and after a restart"
+    )
+    return KeyRing.generate()
+
+
+keyring = load_keyring()
@@ -0,0 +1,110 @@
+import os
+from abc import ABC, abstractmethod
+from signing_keys import ALGORITHM
+
+# jose (python-jose) or pyjwt (PyJWT), both pass the same test vectors, see
+# benchmarks/jwt_codecs.py for their encode and decode throughput
+JWT_BACKEND = os.getenv("TODOAPP_JWT_BACKEND", "jose")
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+class TokenCodec(ABC):
+    """Signs and verifies tokens with the keys of a signing_keys.KeyRing.
+
+    ``encode`` puts the key's kid in the header, ``decode`` uses it to find
+    the verification key and raises InvalidTokenError for any token that is
+    malformed, expired, signed by an unknown key or not signed by us.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def encode(self, claims: dict, signing_key) -> str:
+        pass
+
+    @abstractmethod
+    def decode(self, token: str, keyring) -> dict:
+        pass
+
+
+class JoseCodec(TokenCodec):
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwk, jwt
+
+        self._jwt = jwt
+        self._jwk = jwk
+        self._error = JWTError
+        # parsed jose keys by kid, built once instead of on every call
+        self._signers = {}
+        self._verifiers = {}
+
+    def encode(self, claims: dict, signing_key) -> str:
+        signer = self._signers.get(signing_key.kid)
+        if signer is None:
+            signer = self._jwk.construct(signing_key.private_pem, ALGORITHM)
+            self._signers[signing_key.kid] = signer
+        return self._jwt.encode(
+            claims, signer, algorithm=ALGORITHM, headers={"kid": signing_key.kid}
+        )
+
+    def decode(self, token: str, keyring) -> dict:
+        try:
+            kid = self._jwt.get_unverified_header(token).get("kid")
+            verifier = self._verifiers.get(kid)
+            if verifier is None:
+                signing_key = keyring.get(kid)
+                if signing_key is None:
+                    raise InvalidTokenError("Unknown signing key")
+                verifier = self._jwk.construct(signing_key.public_pem, ALGORITHM)
+                self._verifiers[kid] = verifier
+            return self._jwt.decode(token, verifier, algorithms=[ALGORITHM])
+        except self._error as error:
+            raise InvalidTokenError(str(error))
+
+
+class PyJWTCodec(TokenCodec):
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt
+
+        self._jwt = jwt
+        self._error = jwt.PyJWTError
+
+    def encode(self, claims: dict, signing_key) -> str:
+        # PyJWT signs with the cryptography key object directly
+        return self._jwt.encode(
+            claims,
+            signing_key.private_key,
+            algorithm=ALGORITHM,
+            headers={"kid": signing_key.kid},
+        )
+
+    def decode(self, token: str, keyring) -> dict:
+        try:
+            kid = self._jwt.get_unverified_header(token).get("kid")
+            signing_key = keyring.get(kid)
+            if signing_key is None:
+                raise InvalidTokenError("Unknown signing key")
+            return self._jwt.decode(
+                token, signing_key.public_key, algorithms=[ALGORITHM]
+            )
+        except self._error as error:
+            raise InvalidTokenError(str(error))
+
+
+CODECS = {codec.name: codec for codec in (JoseCodec, PyJWTCodec)}
+
+
+def get_codec(backend: str = JWT_BACKEND) -> TokenCodec:
+    if backend not in CODECS:
+        raise ValueError(f"Unknown TODOAPP_JWT_BACKEND {backend!r}")
+    return CODECS[backend]()
+
+
+codec = get_codec()
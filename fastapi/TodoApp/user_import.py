@@ -0,0 +1,186 @@
+import codecs
+import csv
+import json
+import os
+from fastapi import UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from models import Users
+from passwords import hash_passwords
+
+# users are validated, hashed and inserted this many at a time, one commit
+# and one progress line per batch
+IMPORT_BATCH_SIZE = int(os.getenv("TODOAPP_IMPORT_BATCH_SIZE", "500"))
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+class ImportedUser(BaseModel):
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    password: str
+    role: str
+
+
+async def iter_lines(upload: UploadFile, chunk_size: int = 64 * 1024):
+    # reads the upload a chunk at a time, the file is never fully in memory
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_rows(upload: UploadFile, file_format: str):
+    # yields (line number, row dict or None if the line can't be parsed)
+    # csv rows are one per line, quoted values can't contain newlines
+    header = None
+    line_number = 0
+    async for line in iter_lines(upload):
+        line_number += 1
+        if not line.strip():
+            continue
+        if file_format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row = dict(zip(header, values)) if len(values) == len(header) else None
+        else:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                row = None
+        yield line_number, row
+
+
+async def import_users(db, upload: UploadFile, file_format: str):
+    """Imports users from a csv or json lines upload, streaming ndjson progress.
+
+    Every batch yields a line with the running totals and the rows that were
+    rejected: ``422`` for invalid rows, ``409`` when the username or email
+    already exists in the database or earlier in the file. A last line with
+    ``"done": true`` closes the stream.
+    """
+    totals = {"processed": 0, "created": 0, "conflicts": 0, "errors": 0}
+    # usernames and emails seen so far, to catch duplicates within the file
+    seen_usernames = set()
+    seen_emails = set()
+    batch = []
+
+    async def flush():
+        rejected = []
+        valid = []
+        for line_number, row in batch:
+            try:
+                imported_user = ImportedUser(**(row or {}))
+            except (TypeError, ValidationError):
+                rejected.append({"line": line_number, "status": 422})
+                continue
+            if (
+                imported_user.username in seen_usernames
+                or imported_user.email in seen_emails
+            ):
+                rejected.append({"line": line_number, "status": 409})
+                continue
+            seen_usernames.add(imported_user.username)
+            seen_emails.add(imported_user.email)
+            valid.append((line_number, imported_user))
+
+        # password hashes by line, only rows that are about to be inserted are
+        # hashed, so re-running an import doesn't pay bcrypt for rows that
+        # already exist
+        hashed_passwords = {}
+
+        # a concurrent signup can still take a name between the check and the
+        # insert, then the batch is checked again once before giving up
+        for attempt in range(2):
+            taken = set()
+            if valid:
+                result = await db.execute(
+                    select(Users.username, Users.email).where(
+                        or_(
+                            Users.username.in_([u.username for _, u in valid]),
+                            Users.email.in_([u.email for _, u in valid]),
+                        )
+                    )
+                )
+                for username, email in result:
+                    taken.update((username, email))
+                # end the read transaction so the connection goes back to the
+                # pool while the passwords are hashed
+                await db.rollback()
+            insertable = [
+                (line_number, imported_user)
+                for line_number, imported_user in valid
+                if imported_user.username not in taken
+                and imported_user.email not in taken
+            ]
+            unhashed = [
+                (line_number, imported_user)
+                for line_number, imported_user in insertable
+                if line_number not in hashed_passwords
+            ]
+            hashed_passwords.update(
+                zip(
+                    [line_number for line_number, _ in unhashed],
+                    await hash_passwords(
+                        [imported_user.password for _, imported_user in unhashed]
+                    ),
+                )
+            )
+            rows = [
+                {
+                    "username": imported_user.username,
+                    "email": imported_user.email,
+                    "first_name": imported_user.first_name,
+                    "last_name": imported_user.last_name,
+                    "role": imported_user.role,
+                    "hashed_password": hashed_passwords[line_number],
+                    "is_active": True,
+                }
+                for line_number, imported_user in insertable
+            ]
+            try:
+                if rows:
+                    await db.execute(insert(Users).values(rows))
+                await db.commit()
+                break
+            except IntegrityError:
+                await db.rollback()
+                if attempt:
+                    raise
+
+        rejected += [
+            {"line": line_number, "status": 409}
+            for line_number, imported_user in valid
+            if imported_user.username in taken or imported_user.email in taken
+        ]
+        rejected.sort(key=lambda item: item["line"])
+        totals["processed"] += len(batch)
+        totals["created"] += len(rows)
+        totals["conflicts"] += sum(item["status"] == 409 for item in rejected)
+        totals["errors"] += sum(item["status"] == 422 for item in rejected)
+        batch.clear()
+        return (json.dumps({**totals, "rejected": rejected}) + "\n").encode()
+
+    async for line_number, row in iter_rows(upload, file_format):
+        batch.append((line_number, row))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            yield await flush()
+    if batch:
+        yield await flush()
+    yield (json.dumps({**totals, "done": True}) + "\n").encode()